@@ -0,0 +1,41 @@
+"""
+County name normalization shared by the ingest step (createDatabase.py)
+and SelectiveCountyMapper, kept free of geopandas so the ingest can use it
+"""
+
+import re
+import unicodedata
+
+
+# Longest first so "city and borough" is removed before "borough".
+# "planning region" covers the 2022 Connecticut county equivalents used by Geography.csv;
+# the 2021 Census shapefile loaded by SelectiveCountyMapper still has the old CT counties, so those names stay unresolved
+COUNTY_SUFFIXES = (
+    'city and borough', 'planning region', 'census area', 'municipality',
+    'municipio', 'borough', 'parish', 'county', 'city'
+)
+
+
+def normalize_county_name(name: str, strip_suffix: bool = True) -> str:
+    """
+    Normalize a county name for lookups
+    "St. Mary's Parish" -> "st marys", "Doña Ana County" -> "dona ana",
+    "Adjuntas Municipio" -> "adjuntas"
+
+    Args:
+        name: County name as typed or as found in Geography.csv / Census data
+        strip_suffix: Remove a trailing County/Parish/Borough/city/... word
+
+    Returns:
+        Lowercase ASCII name with punctuation and extra spaces removed
+    """
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    name = re.sub(r"['’.]", '', name)
+    name = re.sub(r'[^a-z0-9]+', ' ', name).strip()
+    name = re.sub(r'^saint ', 'st ', name)
+
+    if strip_suffix:
+        for suffix in COUNTY_SUFFIXES:
+            if name.endswith(' ' + suffix):
+                return name[:-len(suffix) - 1]
+    return name
@@ -1,9 +1,16 @@
 
+import csv
 import json
+import os
+import sqlite3
+
+from county_names import normalize_county_name
 
 db_area={}
 db_wage={}
 hours_in_year=2080
+db_sqlite_file='db_wages.sqlite'
+wage_level_columns={"level1":3, "level2":4, "level3":5, "level4":6, "avg":7} # column index of each wage level in ALC_Export.csv
 
 def extractGeographyInfo(file_geography):
 
@@ -87,14 +94,138 @@ def extractWageInfo(file_wages, expected_occupation_code):
     #save db_wage to a file
     with open('db_wage_software_dev.json', 'w') as f:
         json.dump(db_wage, f, indent=4)    
+
+def createSqliteSchema(conn):
+    # tables follow the README design; salary is stored one row per (area, soc, level)
+    # so a single index serves every wage level lookup.
+    # the script opens the transaction the inserts run in, so a failed ingest rolls back the drops too
+    conn.executescript("""
+        BEGIN;
+        DROP TABLE IF EXISTS salary;
+        DROP TABLE IF EXISTS soc_code;
+        DROP TABLE IF EXISTS county;
+        DROP TABLE IF EXISTS bls_area;
+        DROP TABLE IF EXISTS state;
+
+        CREATE TABLE state (
+            state_code TEXT PRIMARY KEY,
+            state_name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE bls_area (
+            area_code TEXT PRIMARY KEY,
+            area_name TEXT NOT NULL
+        );
+        CREATE TABLE county (
+            state_code  TEXT NOT NULL REFERENCES state(state_code),
+            area_code   TEXT NOT NULL REFERENCES bls_area(area_code),
+            county_name TEXT NOT NULL,
+            county_fips TEXT,
+            PRIMARY KEY (state_code, area_code, county_name)
+        );
+        CREATE TABLE soc_code (
+            soc_code  TEXT PRIMARY KEY,
+            work_name TEXT NOT NULL
+        );
+        CREATE TABLE salary (
+            area_code TEXT NOT NULL REFERENCES bls_area(area_code),
+            soc_code  TEXT NOT NULL,
+            level     TEXT NOT NULL,
+            wage      REAL NOT NULL,
+            PRIMARY KEY (area_code, soc_code, level)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX idx_salary_soc_level_wage ON salary (soc_code, level, wage, area_code);
+        CREATE INDEX idx_county_state_area ON county (state_code, area_code, county_name, county_fips);
+    """)
+
+def extractGeographyInfoSqlite(conn, file_geography):
+    with open(file_geography, 'r', encoding='utf-8-sig', newline='') as geo_file:
+        reader = csv.reader(geo_file)
+        next(reader) # header
+        for area_code, area_name, state_code, state_name, county_name in reader:
+            conn.execute("INSERT OR IGNORE INTO state VALUES (?, ?)", (state_code, state_name))
+            conn.execute("INSERT OR IGNORE INTO bls_area VALUES (?, ?)", (area_code, area_name))
+            conn.execute("INSERT OR IGNORE INTO county (state_code, area_code, county_name) VALUES (?, ?, ?)",
+                         (state_code, area_code, county_name))
+
+def extractCountyFips(conn, file_county_fips):
+    # file_county_fips is the Census national county list (national_county2020.txt),
+    # pipe delimited: STATE|STATEFP|COUNTYFP|COUNTYNS|COUNTYNAME|CLASSFP|FUNCSTAT.
+    # names are matched normalized, so "Dona Ana County" finds "Doña Ana County"
+    fips_index = {}
+    with open(file_county_fips, 'r', encoding='utf-8-sig', newline='') as fips_file:
+        reader = csv.DictReader(fips_file, delimiter='|')
+        rows = sorted(reader, key=lambda row: row["COUNTYNAME"].endswith(' city')) # a bare name means the county
+        for row in rows:
+            state_index = fips_index.setdefault(row["STATE"], {})
+            fips = row["STATEFP"] + row["COUNTYFP"]
+            state_index[normalize_county_name(row["COUNTYNAME"], strip_suffix=False)] = fips
+        for row in rows:
+            fips_index[row["STATE"]].setdefault(normalize_county_name(row["COUNTYNAME"]), row["STATEFP"] + row["COUNTYFP"])
+
+    updates = []
+    unmatched = []
+    for state_code, area_code, county_name in conn.execute("SELECT state_code, area_code, county_name FROM county").fetchall():
+        state_index = fips_index.get(state_code, {})
+        fips = (state_index.get(normalize_county_name(county_name, strip_suffix=False))
+                or state_index.get(normalize_county_name(county_name)))
+        if fips is None:
+            unmatched.append(f"{county_name}, {state_code}")
+        else:
+            updates.append((fips, state_code, area_code, county_name))
+
+    conn.executemany("UPDATE county SET county_fips = ? WHERE state_code = ? AND area_code = ? AND county_name = ?", updates)
+    if unmatched:
+        print(f"no fips code for {len(unmatched)} counties, e.g. {unmatched[:20]}")
+
+def extractSocCodes(conn, file_soc_codes):
+    with open(file_soc_codes, 'r', encoding='utf-8-sig', newline='') as soc_file:
+        reader = csv.reader(soc_file)
+        next(reader) # header
+        conn.executemany("INSERT OR IGNORE INTO soc_code VALUES (?, ?)",
+                         ((values[0], values[1]) for values in reader))
+
+def extractWageInfoSqlite(conn, file_wages):
+    # unlike extractWageInfo, every occupation is kept so any soc code can be queried
+    with open(file_wages, 'r', encoding='utf-8-sig', newline='') as wage_file:
+        reader = csv.reader(wage_file)
+        next(reader) # header
+        conn.executemany("INSERT OR REPLACE INTO salary VALUES (?, ?, ?, ?)",
+                         ((values[0], values[1], level, round(float(values[column])*hours_in_year, 2))
+                          for values in reader
+                          for level, column in wage_level_columns.items()
+                          if values[column] != ''))
+
+def buildSqliteDatabase(file_geography, file_wages, file_soc_codes, file_county_fips=None, db_file=db_sqlite_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        # WAL lets any number of readers query the file while it is being rebuilt
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            createSqliteSchema(conn)
+            extractGeographyInfoSqlite(conn, file_geography)
+            if file_county_fips is not None:
+                extractCountyFips(conn, file_county_fips)
+            extractSocCodes(conn, file_soc_codes)
+            extractWageInfoSqlite(conn, file_wages)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return db_file
             
 def __main__():        
     file_geography= "OFLC_Wages_2025-26_Updated/Geography.csv"
     file_wages="OFLC_Wages_2025-26_Updated/ALC_Export.csv"
+    file_soc_codes="OFLC_Wages_2025-26_Updated/oes_soc_occs.csv"
+    file_county_fips="OFLC_Wages_2025-26_Updated/national_county2020.txt" # https://www2.census.gov/geo/docs/reference/codes2020/national_county2020.txt
     software_dev_occupation_code= "15-1252"  # SOC code for Software Developers and Software Quality Assurance Analysts and Testers
             
     # extractGeographyInfo(file_geography)        
     extractWageInfo(file_wages, software_dev_occupation_code)
-        
+    if not os.path.exists(file_county_fips):
+        print(f"{file_county_fips} not found, county_fips will be left empty")
+        file_county_fips = None
+    buildSqliteDatabase(file_geography, file_wages, file_soc_codes, file_county_fips)
 
-__main__()
\ No newline at end of file
+if __name__ == '__main__':
+    __main__()
@@ -1,4 +1,5 @@
 import json
+import sqlite3
 from selective_county_mapper import SelectiveCountyMapper
 
 #input: state name, current salary, level 1 or 2 or 3 or 4
@@ -30,6 +31,66 @@ def fetch_counties_by_wage(state_name, current_salary, wage_level):
     return sorted(result_counties)
 
 
+def connect_readonly(db_file='db_wages.sqlite'):
+    # read-only URI so any number of processes can query the ingest output side by side
+    return sqlite3.connect(f'file:{db_file}?mode=ro', uri=True)
+
+
+#same contract as fetch_counties_by_wage, answered from the sqlite store built by createDatabase.buildSqliteDatabase
+#pass conn to reuse one connection across many calls, it is left open for the caller
+def fetch_counties_by_wage_sqlite(state_name, current_salary, wage_level, soc_code='15-1252', db_file='db_wages.sqlite', conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_readonly(db_file)
+    try:
+        # the IN list is a range scan on idx_salary_soc_level_wage, and each (state, area)
+        # pair is then a covering lookup on idx_county_state_area
+        rows = conn.execute("""
+            SELECT county_name
+            FROM county
+            WHERE state_code = (SELECT state_code FROM state WHERE state_name = ?)
+              AND area_code IN (SELECT area_code FROM salary
+                                WHERE soc_code = ? AND level = ? AND wage <= ?)
+            ORDER BY county_name
+        """, (state_name, soc_code, wage_level, current_salary)).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return [row[0] for row in rows]
+
+
+def fetch_states_sqlite(db_file='db_wages.sqlite', conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_readonly(db_file)
+    try:
+        rows = conn.execute("SELECT state_name, state_code FROM state ORDER BY state_name").fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return dict(rows)
+
+
+#output: {state code: {county: {level: wage}}} with Geography.csv county names,
+#SelectiveCountyMapper exports resolve them to Census FIPS codes
+def fetch_county_wages_sqlite(soc_code='15-1252', db_file='db_wages.sqlite'):
+    conn = connect_readonly(db_file)
+    try:
+        rows = conn.execute("""
+            SELECT c.state_code, c.county_name, s.level, s.wage
+            FROM salary s
+            JOIN county c ON c.area_code = s.area_code
+            WHERE s.soc_code = ?
+        """, (soc_code,)).fetchall()
+    finally:
+        conn.close()
+
+    county_wages = {}
+    for state_code, county_name, level, wage in rows:
+        county_wages.setdefault(state_code, {}).setdefault(county_name, {})[level] = wage
+    return county_wages
+
+
 def visualize(statesAndCounties):
 
     mapper = SelectiveCountyMapper()
@@ -39,6 +100,13 @@ def visualize(statesAndCounties):
         selections[state] = counties
     # print(selections)
             
+    # map Geography.csv spellings onto Census county names, reporting what was corrected or dropped
+    selections, corrections, unresolved = mapper.resolve_counties(selections)
+    for state, fixes in corrections.items():
+        print(f"corrected in {state}: {fixes}")
+    for state, counties in unresolved.items():
+        print(f"not found in {state}: {counties}")
+
     if selections:
         is_valid, msg = mapper.validate_selection(selections)
         if(not is_valid):
@@ -74,4 +142,5 @@ def __main__():
         
     visualize(statesAndCounties)
 
-__main__()
\ No newline at end of file
+if __name__ == '__main__':
+    __main__()
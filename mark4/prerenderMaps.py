@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fetchDetails import connect_readonly, fetch_counties_by_wage_sqlite, fetch_states_sqlite
+
+#offline job: renders one folium map per distinct county selection over every state x level x salary band,
+#so a request only has to look up the manifest and serve the html file
+wage_levels = ["level1", "level2", "level3", "level4", "avg"]
+manifest_name = "manifest.json"
+
+_mapper = None # one SelectiveCountyMapper per worker process, the county shapefile is loaded once
+
+
+def salary_bands(min_salary, max_salary, step):
+    return list(range(min_salary, max_salary + 1, step))
+
+
+def selection_hash(selections):
+    # identical county sets render identical maps, so they share one file
+    canonical = json.dumps({state: sorted(counties) for state, counties in selections.items()}, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def band_key(state_code, wage_level, salary):
+    return f"{state_code}/{wage_level}/{salary}"
+
+
+def collect_selections(salaries, db_file='db_wages.sqlite', soc_code='15-1252'):
+    entries = {}    # band key -> selection hash, None when no county qualifies
+    selections = {} # selection hash -> {state_code: [county, ...]}
+    conn = connect_readonly(db_file) # one connection for the whole sweep
+    try:
+        for state_name, state_code in fetch_states_sqlite(conn=conn).items():
+            for wage_level in wage_levels:
+                for salary in salaries:
+                    counties = fetch_counties_by_wage_sqlite(state_name, salary, wage_level, soc_code, conn=conn)
+                    if len(counties) == 0:
+                        entries[band_key(state_code, wage_level, salary)] = None
+                        continue
+                    # full Geography.csv names; the worker resolves them, keeping "Richmond County" and "Richmond city" apart
+                    selection = {state_code: counties}
+                    digest = selection_hash(selection)
+                    selections.setdefault(digest, selection)
+                    entries[band_key(state_code, wage_level, salary)] = digest
+    finally:
+        conn.close()
+    return entries, selections
+
+
+def _init_worker():
+    global _mapper
+    from selective_county_mapper import SelectiveCountyMapper
+    _mapper = SelectiveCountyMapper()
+
+
+def _render(args):
+    digest, selection, output_file = args
+    # same name resolution visualize does, so Geography.csv spellings match Census names
+    resolved, _, unresolved = _mapper.resolve_counties(selection)
+    if unresolved:
+        print(f"not found: {unresolved}")
+    if not resolved:
+        return digest, False
+
+    # render next to the final path and rename, so a crashed worker never leaves a partial {digest}.html
+    tmp_file = f"{output_file}.tmp"
+    try:
+        if _mapper.create_selective_map(resolved, tmp_file) is None:
+            return digest, False
+        os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return digest, True
+
+
+def prerender_maps(output_dir='maps', min_salary=50000, max_salary=250000, step=5000,
+                   db_file='db_wages.sqlite', soc_code='15-1252', workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    salaries = salary_bands(min_salary, max_salary, step)
+    entries, selections = collect_selections(salaries, db_file, soc_code)
+
+    # maps left over from an earlier run with the same county set are reused as is
+    jobs = []
+    rendered = set()
+    for digest, selection in selections.items():
+        output_file = os.path.join(output_dir, f"{digest}.html")
+        if os.path.exists(output_file):
+            rendered.add(digest)
+        else:
+            jobs.append((digest, selection, output_file))
+
+    print(f"{len(entries)} selections, {len(selections)} distinct maps, {len(jobs)} to render")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for digest, ok in executor.map(_render, jobs):
+            if ok:
+                rendered.add(digest)
+                print(f"rendered {digest}")
+            else:
+                print(f"failed to render {digest}: {selections[digest]}")
+
+    manifest = {
+        "socCode": soc_code,
+        "minSalary": min_salary,
+        "maxSalary": max_salary,
+        "salaryStep": step,
+        "maps": {key: (f"{digest}.html" if digest in rendered else None) for key, digest in entries.items()},
+    }
+    # swap the manifest in whole, so a lookup running during a rerun never reads a half written file
+    manifest_file = os.path.join(output_dir, manifest_name)
+    with open(f"{manifest_file}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def _load_manifest(manifest_file, mtime_ns):
+    # mtime_ns is part of the cache key only, so a rerun's new manifest is picked up
+    with open(manifest_file, 'r') as f:
+        return json.load(f)
+
+
+#returns the pre-rendered html path for a request, or None when no county qualifies or the map failed to render.
+#the salary is floored to its band, so the map shows counties affordable at the band's lower edge
+def lookup_prerendered_map(state_code, wage_level, salary, output_dir='maps'):
+    manifest_file = os.path.join(output_dir, manifest_name)
+    manifest = _load_manifest(manifest_file, os.stat(manifest_file).st_mtime_ns)
+
+    if salary < manifest["minSalary"]:
+        return None
+    salary = min(salary, manifest["maxSalary"])
+    band = manifest["minSalary"] + (salary - manifest["minSalary"]) // manifest["salaryStep"] * manifest["salaryStep"]
+    file_name = manifest["maps"].get(band_key(state_code, wage_level, int(band)))
+    if file_name is None:
+        return None
+    return os.path.join(output_dir, file_name)
+
+
+def __main__():
+    prerender_maps()
+
+if __name__ == '__main__':
+    __main__()
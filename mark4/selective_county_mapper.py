@@ -13,11 +13,20 @@ import geopandas as gpd
 import folium
 import pandas as pd
 import json
+from difflib import SequenceMatcher
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from county_names import normalize_county_name
+
+
+def _trigrams(key: str) -> set:
+    """Character trigrams of a normalized name, padded so short names still match"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
 
 @dataclass
 class CountyLocation:
@@ -95,6 +104,184 @@ class SelectiveCountyMapper:
         except Exception as e:
             print(f"✗ Error loading counties: {e}")
             raise
+
+        self._build_name_index()
+
+    def _build_name_index(self):
+        """
+        Precompute per-state lookups so validation never scans the GeoDataFrame
+
+        _available:     {state: sorted NAMELSAD names}
+        _name_index:    {state: {normalized name: NAMELSAD}}
+        _trigram_index: {state: {trigram: {normalized name, ...}}}
+        _fips_index:    {(state, NAMELSAD): fips code}
+
+        NAMELSAD ("Richmond city", "Richmond County") is used because NAME is
+        shared by independent cities and counties in VA, MD and MO
+        """
+        self._available = {}
+        self._name_index = {}
+        self._trigram_index = {}
+        self._key_trigrams = {}
+        self._fuzzy_cache = {}
+        self._fips_index = {
+            (state, name): f"{statefp}{countyfp}"
+            for state, name, statefp, countyfp
+            in self.counties[['STUSPS', 'NAMELSAD', 'STATEFP', 'COUNTYFP']].itertuples(index=False)
+        }
+
+        pairs = self.counties[['STUSPS', 'NAMELSAD']].drop_duplicates()
+        for state, group in pairs.groupby('STUSPS'):
+            names = sorted(group['NAMELSAD'])
+            self._available[state] = names
+
+            # Full names win over suffix-stripped ones ("Carson City" vs "Carson"),
+            # and a bare "Richmond" means the county, so independent cities go last
+            index = {normalize_county_name(n, strip_suffix=False): n for n in names}
+            for n in sorted(names, key=lambda n: n.endswith(' city')):
+                index.setdefault(normalize_county_name(n), n)
+            self._name_index[state] = index
+
+            trigram_index = {}
+            key_trigrams = {}
+            for key in index:
+                grams = _trigrams(key)
+                key_trigrams[key] = grams
+                for gram in grams:
+                    trigram_index.setdefault(gram, set()).add(key)
+            self._trigram_index[state] = trigram_index
+            self._key_trigrams[state] = key_trigrams
+
+    def lookup_county(self, state: str, county: str) -> Optional[str]:
+        """
+        Exact lookup after normalization
+
+        Args:
+            state: Two-letter state abbreviation
+            county: County name, with or without County/Parish/Borough/city suffix
+
+        Returns:
+            Census NAMELSAD, or None if not found
+        """
+        index = self._name_index.get(state.upper())
+        if index is None:
+            return None
+        return (index.get(normalize_county_name(county, strip_suffix=False))
+                or index.get(normalize_county_name(county)))
+
+    def fuzzy_match_county(self,
+                           state: str,
+                           county: str,
+                           min_score: float = 0.5,
+                           min_ratio: float = 0.8) -> Optional[str]:
+        """
+        Closest county name in a state by trigram similarity
+
+        Args:
+            state: Two-letter state abbreviation
+            county: Possibly misspelled county name
+            min_score: Minimum trigram Jaccard similarity to accept a match
+            min_ratio: Minimum edit-distance ratio to accept a match
+
+        Returns:
+            Census NAMELSAD, or None if nothing is close enough
+        """
+        state = state.upper()
+        key = normalize_county_name(county)
+        cache_key = (state, key, min_score, min_ratio)
+        if cache_key in self._fuzzy_cache:
+            return self._fuzzy_cache[cache_key]
+
+        trigram_index = self._trigram_index.get(state, {})
+        key_trigrams = self._key_trigrams.get(state, {})
+        grams = _trigrams(key)
+
+        candidates = set()
+        for gram in grams:
+            candidates |= trigram_index.get(gram, set())
+
+        best, best_score = None, (0.0, 0.0)
+        for candidate in candidates:
+            other = key_trigrams[candidate]
+            jaccard = len(grams & other) / len(grams | other)
+            score = (jaccard, SequenceMatcher(None, key, candidate).ratio())
+            if score > best_score:
+                best, best_score = candidate, score
+
+        # Short names share few trigrams ("clerk"/"clark"), so a close edit distance also counts
+        jaccard, ratio = best_score
+        if best is not None and (jaccard >= min_score or ratio >= min_ratio):
+            match = self._name_index[state][best]
+        else:
+            match = None
+        self._fuzzy_cache[cache_key] = match
+        return match
+
+    def resolve_counties(self,
+                         selections: Dict[str, List[str]],
+                         min_score: float = 0.5,
+                         min_ratio: float = 0.8) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, str]], Dict[str, List[str]]]:
+        """
+        Map user county names onto Census NAMELSAD names in one batch
+        Exact normalized matches first, then fuzzy matches
+
+        Args:
+            selections: {state: [county1, county2, ...]}
+            min_score: Minimum trigram similarity for a fuzzy correction
+            min_ratio: Minimum edit-distance ratio for a fuzzy correction
+
+        Returns:
+            Tuple of (resolved selections, {state: {input: correction}}, {state: [unresolved]})
+        """
+        resolved = {}
+        corrections = {}
+        unresolved = {}
+
+        for state, counties in selections.items():
+            state = state.upper()
+            names = []
+            for county in counties:
+                match = self.lookup_county(state, county)
+                if match is None:
+                    match = self.fuzzy_match_county(state, county, min_score, min_ratio)
+                    if match is not None:
+                        corrections.setdefault(state, {})[county] = match
+                if match is None:
+                    unresolved.setdefault(state, []).append(county)
+                elif match not in names:
+                    names.append(match)
+            if names:
+                resolved[state] = names
+
+        return resolved, corrections, unresolved
+
+    def resolve_county_wages(self,
+                             wages: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+        """
+        Key per-county wage attributes by Census FIPS code
+        Names are resolved like resolve_counties, FIPS comes from the shapefile
+
+        Args:
+            wages: {state: {county: {level: wage}}} with Geography.csv county names
+
+        Returns:
+            {fips_code: {level: wage}}
+        """
+        county_wages = {}
+        unresolved = 0
+
+        for state, counties in wages.items():
+            state = state.upper()
+            for county, levels in counties.items():
+                match = self.lookup_county(state, county) or self.fuzzy_match_county(state, county)
+                if match is None:
+                    unresolved += 1
+                    continue
+                county_wages[self._fips_index[(state, match)]] = levels
+
+        if unresolved:
+            print(f"✗ Could not match {unresolved} wage counties to Census counties")
+        return county_wages
     
     def get_available_counties(self, state: str) -> List[str]:
         """
@@ -104,17 +291,14 @@ class SelectiveCountyMapper:
             state: Two-letter state abbreviation
         
         Returns:
-            Sorted list of county names
+            Sorted list of county names with their legal suffix (NAMELSAD)
         """
         state = state.upper()
-        state_counties = self.counties[self.counties['STUSPS'] == state]
-        
-        if state_counties.empty:
+        if state not in self._available:
             print(f"✗ State '{state}' not found")
             return []
         
-        counties = sorted(state_counties['NAME'].unique())
-        return counties
+        return list(self._available[state])
     
     def validate_selection(self, selections: Dict[str, List[str]]) -> Tuple[bool, str]:
         """
@@ -130,21 +314,14 @@ class SelectiveCountyMapper:
             return False, "No states selected"
         
         for state, counties in selections.items():
-            # if(state == "PR"):
-            #     continue
-            # state = state.upper()
-            # available = self.get_available_counties(state)
-            available = counties
-                
-            # if not available:
-            #     return False, f"State '{state}' not found"
+            if state.upper() not in self._name_index:
+                return False, f"State '{state}' not found"
             
-            # if not counties:
-            #     # continue
-            #     return False, f"No counties specified for {state}"
+            if not counties:
+                return False, f"No counties specified for {state}"
             
-            # Check each county exists
-            missing = [c for c in counties if c not in available]
+            # Check each county exists (suffix and case insensitive)
+            missing = [c for c in counties if self.lookup_county(state, c) is None]
             if missing:
                 return False, f"Unknown counties in {state}: {missing}"
         
@@ -166,8 +343,9 @@ class SelectiveCountyMapper:
             state = state.upper()
             state_data = self.counties[self.counties['STUSPS'] == state]
             
-            # Filter to selected counties
-            selected = state_data[state_data['NAME'].isin(counties)]
+            # Filter to selected counties, accepting any spelling lookup_county resolves
+            names = {self.lookup_county(state, c) or c for c in counties}
+            selected = state_data[state_data['NAMELSAD'].isin(names)]
             frames.append(selected)
         
         if not frames:
@@ -198,7 +376,7 @@ class SelectiveCountyMapper:
         color_idx = 0
         for _, county in selected_geo.iterrows():
             state = county['STUSPS']
-            county_name = county['NAME']
+            county_name = county['NAMELSAD']  # "Richmond city" and "Richmond County" share NAME
             
             location = CountyLocation(
                 state=state,
@@ -266,7 +444,120 @@ class SelectiveCountyMapper:
         df.to_csv(output_file, index=False)
         print(f"✓ Exported {len(locations)} county locations to {output_file}")
         return output_file
-    
+
+    def export_locations_ndjson(self,
+                               locations: List[CountyLocation],
+                               output_file: str = 'selected_counties.ndjson',
+                               wages: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """
+        Export selected county locations as newline-delimited JSON
+        One compact object per line, written as it is produced
+
+        Args:
+            locations: List of CountyLocation objects
+            output_file: Output NDJSON filename
+            wages: Optional {state: {county: {level: wage}}} attributes to attach
+
+        Returns:
+            Path to output file
+        """
+        county_wages = self.resolve_county_wages(wages) if wages is not None else None
+        missing = 0
+
+        with open(output_file, 'w') as f:
+            for loc in locations:
+                record = loc.to_dict()
+                if county_wages is not None:
+                    levels = county_wages.get(loc.fips_code)
+                    if levels is None:
+                        missing += 1
+                    else:
+                        record.update(levels)
+                f.write(json.dumps(record, separators=(',', ':')))
+                f.write('\n')
+
+        if missing:
+            print(f"✗ No wages for {missing} of {len(locations)} counties")
+
+        print(f"✓ Exported {len(locations)} county locations to {output_file}")
+        return output_file
+
+    def get_selected_counties_export(self,
+                                     selections: Dict[str, List[str]],
+                                     wages: Optional[Dict[str, Dict[str, float]]] = None) -> gpd.GeoDataFrame:
+        """
+        Build export-ready GeoDataFrame of selected county polygons
+
+        Args:
+            selections: {state: [county1, county2, ...]}
+            wages: Optional {state: {county: {level: wage}}} attributes to attach
+
+        Returns:
+            GeoDataFrame with state, county_name, fips_code, wage columns and geometry
+        """
+        selected_geo = self.get_selected_counties_geo(selections)
+        if selected_geo.empty:
+            return gpd.GeoDataFrame(geometry=[], crs=self.counties.crs)
+
+        export = gpd.GeoDataFrame({
+            'state': selected_geo['STUSPS'],
+            'county_name': selected_geo['NAMELSAD'],
+            'fips_code': selected_geo['STATEFP'] + selected_geo['COUNTYFP'],
+        }, geometry=selected_geo.geometry.values, crs=self.counties.crs)
+
+        if wages is not None:
+            wage_df = pd.DataFrame.from_dict(self.resolve_county_wages(wages), orient='index')
+            wage_df.index.name = 'fips_code'
+            export = export.merge(wage_df, how='left', left_on='fips_code', right_index=True)
+            # Counties whose FIPS code had no wage row at all
+            missing = len(export) - export['fips_code'].isin(wage_df.index).sum()
+            if missing:
+                print(f"✗ No wages for {missing} of {len(export)} counties")
+
+        return export.sort_values(['state', 'county_name'], ignore_index=True)
+
+    def export_counties_geoparquet(self,
+                                   selections: Dict[str, List[str]],
+                                   output_file: str = 'selected_counties.parquet',
+                                   wages: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """
+        Export selected county polygons to GeoParquet
+        Columnar format for data warehouse ingestion (requires pyarrow)
+
+        Args:
+            selections: {state: [county1, county2, ...]}
+            output_file: Output Parquet filename
+            wages: Optional {state: {county: {level: wage}}} attributes to attach
+
+        Returns:
+            Path to output file
+        """
+        export = self.get_selected_counties_export(selections, wages)
+        export.to_parquet(output_file, index=False, compression='zstd')
+        print(f"✓ Exported {len(export)} county geometries to {output_file}")
+        return output_file
+
+    def export_counties_flatgeobuf(self,
+                                   selections: Dict[str, List[str]],
+                                   output_file: str = 'selected_counties.fgb',
+                                   wages: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """
+        Export selected county polygons to FlatGeobuf
+        Spatially indexed, streamable format for GIS tools
+
+        Args:
+            selections: {state: [county1, county2, ...]}
+            output_file: Output FlatGeobuf filename
+            wages: Optional {state: {county: {level: wage}}} attributes to attach
+
+        Returns:
+            Path to output file
+        """
+        export = self.get_selected_counties_export(selections, wages)
+        export.to_file(output_file, driver='FlatGeobuf', SPATIAL_INDEX='YES')
+        print(f"✓ Exported {len(export)} county geometries to {output_file}")
+        return output_file
+
     def create_selective_map(self,
                             selections: Dict[str, List[str]],
                             output_file: str = 'selected_counties_map.html',
@@ -293,8 +584,8 @@ class SelectiveCountyMapper:
         selected_geo = self.get_selected_counties_geo(selections)
         locations = self.get_selected_locations(selections)
         
-        # Create color mapping
-        color_map = {f"{loc.state}_{loc.county_name}": loc.color for loc in locations}
+        # Create color mapping, keyed by FIPS so same-named counties keep their own color
+        color_map = {loc.fips_code: loc.color for loc in locations}
         
         # Calculate map center from selected counties
         bounds = selected_geo.total_bounds
@@ -314,9 +605,8 @@ class SelectiveCountyMapper:
             all_counties['centroid'] = all_counties.geometry.centroid
             
             for _, county in all_counties.iterrows():
-                state = county['STUSPS']
-                county_name = county['NAME']
-                key = f"{state}_{county_name}"
+                county_name = county['NAMELSAD']
+                key = f"{county['STATEFP']}{county['COUNTYFP']}"
                 
                 # Use selected color or light gray
                 color = color_map.get(key, '#E0E0E0')
@@ -330,7 +620,7 @@ class SelectiveCountyMapper:
                         'weight': 0.5,
                         'fillOpacity': op
                     },
-                    tooltip=county_name if op > 0.5 else None
+                    tooltip=county_name if opacity > 0.5 else None
                 ).add_to(m)
         else:
             # Add only selected counties
@@ -338,14 +628,14 @@ class SelectiveCountyMapper:
             
             for _, county in selected_geo.iterrows():
                 state = county['STUSPS']
-                county_name = county['NAME']
-                key = f"{state}_{county_name}"
+                county_name = county['NAMELSAD']
+                key = f"{county['STATEFP']}{county['COUNTYFP']}"
                 color = color_map[key]
                 centroid = county['centroid']
                 
                 # Create popup with location info
                 popup_text = f"""
-                <b>{county_name} County, {state}</b><br>
+                <b>{county_name}, {state}</b><br>
                 Lat: {centroid.y:.6f}<br>
                 Lon: {centroid.x:.6f}<br>
                 FIPS: {county['STATEFP']}{county['COUNTYFP']}<br>
@@ -405,8 +695,8 @@ class SelectiveCountyMapper:
         Args:
             locations: List of CountyLocation objects
         """
-        print(f"\n{'State':8} {'County':25} {'Latitude':12} {'Longitude':13} {'Color':12}")
-        print("-" * 75)
+        print(f"\n{'State':8} {'County':35} {'Latitude':12} {'Longitude':13} {'Color':12}")
+        print("-" * 85)
         
         for loc in locations:
-            print(f"{loc.state:8} {loc.county_name:25} {loc.latitude:12.6f} {loc.longitude:13.6f} {loc.color:12}")
+            print(f"{loc.state:8} {loc.county_name:35} {loc.latitude:12.6f} {loc.longitude:13.6f} {loc.color:12}")